@@ -27,18 +27,12 @@ class HonchoInit(Extension):
             if not honcho_helper.is_configured(context):
                 return  # Not configured, skip silently
 
-            client = honcho_helper.get_client(context)
-            if client:
-                session_id = honcho_helper.get_session_id(context)
+            if await honcho_helper.ensure_initialized_async(context):
+                session_id = context._honcho['session_id']
                 honcho_helper._log(
                     context,
                     f"Integration enabled for session: {session_id}",
                     "util",
                 )
-
-                if not hasattr(context, '_honcho'):
-                    context._honcho = {}
-                context._honcho['enabled'] = True
-                context._honcho['session_id'] = session_id
         except Exception as e:
             honcho_helper._log(context, f"Init error: {e}", "error")
@@ -16,41 +16,55 @@ if _PLUGIN_ROOT not in sys.path:
 
 from helpers import honcho_helper  # noqa: E402
 
+# Upper bound on nested content dicts to unwrap
+_MAX_CONTENT_DEPTH = 10
+
+
+def _extract_content(content_data) -> str:
+    """Unwrap nested message payloads down to their text content."""
+    if isinstance(content_data, str):
+        return content_data
+
+    raw_content = content_data
+    for _ in range(_MAX_CONTENT_DEPTH):
+        if type(raw_content) is not dict:
+            break
+        extracted = (
+            raw_content.get('content')
+            or raw_content.get('text')
+            or raw_content.get('message')
+        )
+        if extracted is None:
+            return str(raw_content)
+        raw_content = extracted
+
+    if isinstance(raw_content, str):
+        return raw_content
+    return str(raw_content) if raw_content else ''
+
 
 class HonchoSync(Extension):
 
     async def execute(self, **kwargs):
-        """Sync message to Honcho Cloud."""
+        """Queue message for sync to Honcho Cloud."""
         context: AgentContext = self.agent.context
 
         content_data = kwargs.get('content_data', {})
+        if not content_data:
+            return
         ai = kwargs.get('ai', False)
 
-        # Recursive content extraction
-        raw_content = content_data
-        while isinstance(raw_content, dict):
-            extracted = (
-                raw_content.get('content')
-                or raw_content.get('text')
-                or raw_content.get('message')
-            )
-            if extracted is None:
-                raw_content = str(raw_content)
-                break
-            raw_content = extracted
-
-        content = raw_content if isinstance(raw_content, str) else str(raw_content) if raw_content else ''
+        content = _extract_content(content_data)
         role = 'assistant' if ai else 'user'
 
-        if not content or not content.strip():
+        if not content or content.isspace():
             return
 
         if not honcho_helper.is_configured(context):
             return
 
         try:
-            success = honcho_helper.sync_message(context, role, content)
-            if not success:
-                honcho_helper._log(context, "sync_message returned False", "error")
+            # Failures are logged by the helper
+            await honcho_helper.enqueue_message(context, role, content)
         except Exception as e:
             honcho_helper._log(context, f"Sync error: {e}", "error")
@@ -0,0 +1,29 @@
+"""
+Honcho Sync Flush Extension
+Flushes queued messages to Honcho when the agent finishes its turn.
+"""
+
+import os
+import sys
+
+from agent import AgentContext
+from python.helpers.extension import Extension
+
+# Resolve plugin root and ensure helpers are importable
+_PLUGIN_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if _PLUGIN_ROOT not in sys.path:
+    sys.path.insert(0, _PLUGIN_ROOT)
+
+from helpers import honcho_helper  # noqa: E402
+
+
+class HonchoFlush(Extension):
+
+    async def execute(self, **kwargs):
+        """Give the background sync worker a bounded wait to upload pending messages."""
+        context: AgentContext = self.agent.context
+
+        try:
+            await honcho_helper.flush_sync(context)
+        except Exception as e:
+            honcho_helper._log(context, f"Flush error: {e}", "error")
@@ -29,11 +29,11 @@ class HonchoContext(Extension):
                 config = honcho_helper._get_plugin_config(context.agent0)
                 max_tokens = config.get("honcho_max_context_tokens", 500)
 
-            user_context = honcho_helper.get_user_context(
+            user_context = await honcho_helper.get_user_context_async(
                 context, max_tokens=max_tokens
             )
 
-            if user_context and user_context.strip():
+            if user_context and not user_context.isspace():
                 prompt = self.agent.read_prompt(
                     "honcho.context.md",
                     user_context=user_context,
@@ -3,22 +3,53 @@ Honcho Integration Helper for Agent Zero
 Clean implementation following A0 plugin conventions.
 """
 
+import asyncio
+import importlib.util
+import threading
 import time
+import uuid
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Dict, Any, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from agent import AgentContext
 
-try:
-    from honcho import Honcho
-    HONCHO_AVAILABLE = True
-except ImportError:
-    HONCHO_AVAILABLE = False
-    Honcho = None
+# Honcho SDK class, imported lazily on first client construction;
+# False once the import has failed
+_sdk_state: Optional[Any] = None
+# Memoized find_spec result for the honcho package
+_sdk_found: Optional[bool] = None
 
 # Caches
-_context_cache: Dict[str, tuple] = {}
-_client_cache: Dict[str, Any] = {}
+_context_cache: "OrderedDict[str, tuple]" = OrderedDict()
+# Guards _context_cache; get_user_context also runs in worker threads
+_context_cache_lock = threading.Lock()
+_secrets_cache: Dict[Any, tuple] = {}
+# Fixed pool of init locks, striped by session ID so memory stays bounded
+_INIT_LOCK_STRIPES = 64
+_init_locks = tuple(threading.Lock() for _ in range(_INIT_LOCK_STRIPES))
+# Session IDs for contexts without a chat ID; entries vanish with the context
+_context_uids: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+# Max sessions with cached user context; above 70% full the TTL shrinks
+# linearly, down to 30% of its configured value when the cache is full
+_CACHE_MAX = 512
+_CACHE_PRESSURE_THRESHOLD = 0.7
+_CACHE_TTL_FLOOR = 0.3
+
+# Seconds a loaded secrets dict is reused before re-reading from disk
+_SECRETS_TTL = 30
+
+# Messages longer than this are truncated before upload
+MAX_MESSAGE_LENGTH = 10000
+
+# Background message sync: pending messages per context, messages per upload
+SYNC_QUEUE_SIZE = 256
+SYNC_BATCH_SIZE = 32
+# Seconds flush_sync waits for pending messages before returning
+SYNC_FLUSH_TIMEOUT = 5
 
 
 def _log(context, msg: str, log_type: str = "info"):
@@ -48,12 +79,34 @@ def _get_plugin_config(agent) -> Dict[str, Any]:
     return config
 
 
+def _secrets_key(context) -> Any:
+    """Key secrets cache entries by session ID; None covers context-less calls."""
+    return get_session_id(context) if context is not None else None
+
+
+def _load_secrets_cached(context=None) -> Dict[str, str]:
+    """Load secrets from A0's secrets manager, reusing recent reads."""
+    cache_key = _secrets_key(context)
+    now = time.monotonic()
+    cached = _secrets_cache.get(cache_key)
+    if cached and now - cached[0] < _SECRETS_TTL:
+        return cached[1]
+
+    from python.helpers.secrets import get_secrets_manager
+    secrets = get_secrets_manager(context).load_secrets()
+
+    # Evict expired entries so only recently active chats hold a copy
+    for key, (t, _) in list(_secrets_cache.items()):
+        if now - t >= _SECRETS_TTL:
+            _secrets_cache.pop(key, None)
+    _secrets_cache[cache_key] = (now, secrets)
+    return secrets
+
+
 def get_api_key(context: Optional["AgentContext"] = None) -> Optional[str]:
     """Retrieve HONCHO_API_KEY from A0 secrets manager."""
     try:
-        from python.helpers.secrets import get_secrets_manager
-        secrets_mgr = get_secrets_manager(context)
-        secrets = secrets_mgr.load_secrets()
+        secrets = _load_secrets_cached(context)
         key = secrets.get("HONCHO_API_KEY", "").strip() or None
         return key
     except Exception as e:
@@ -64,45 +117,70 @@ def get_api_key(context: Optional["AgentContext"] = None) -> Optional[str]:
 def _get_secret_value(key: str, default: str, context=None) -> str:
     """Get a value from secrets with fallback."""
     try:
-        from python.helpers.secrets import get_secrets_manager
-        secrets_mgr = get_secrets_manager(context)
-        secrets = secrets_mgr.load_secrets()
+        secrets = _load_secrets_cached(context)
         return secrets.get(key, "").strip() or default
     except Exception:
         return default
 
 
+def is_sdk_available() -> bool:
+    """Check if the Honcho SDK is installed without importing it."""
+    global _sdk_found
+    if _sdk_state is not None:
+        return bool(_sdk_state)
+    if _sdk_found is None:
+        _sdk_found = importlib.util.find_spec("honcho") is not None
+    return _sdk_found
+
+
+def _load_sdk() -> Optional[Any]:
+    """Import the Honcho SDK on first use and return its client class."""
+    global _sdk_state
+    if _sdk_state is not None:
+        return _sdk_state or None
+    try:
+        from honcho import Honcho
+    except ImportError as e:
+        _sdk_state = False
+        _log(None, f"Honcho SDK import failed, integration disabled: {e}", "error")
+        return None
+    _sdk_state = Honcho
+    return _sdk_state
+
+
 def is_configured(context=None) -> bool:
     """Check if Honcho SDK is available and API key is set."""
-    if not HONCHO_AVAILABLE:
+    if not is_sdk_available():
         return False
     return bool(get_api_key(context))
 
 
-def get_client(context=None) -> Optional[Any]:
-    """Get or create a cached Honcho client."""
-    if not HONCHO_AVAILABLE:
-        return None
-    api_key = get_api_key(context)
-    if not api_key:
-        return None
-
-    # Workspace ID: check secrets first (override), then plugin config
+def get_workspace_id(context=None) -> str:
+    """Get the Honcho workspace ID: secrets override first, then plugin config."""
     workspace_id = _get_secret_value("HONCHO_WORKSPACE_ID", "", context)
     if not workspace_id and context and hasattr(context, 'agent0'):
         config = _get_plugin_config(context.agent0)
         workspace_id = config.get("honcho_workspace_id", "agent-zero")
-    if not workspace_id:
-        workspace_id = "agent-zero"
+    return workspace_id or "agent-zero"
 
-    if workspace_id in _client_cache:
-        return _client_cache[workspace_id]
 
+@lru_cache(maxsize=16)
+def _build_client(api_key: str, workspace_id: str) -> Any:
+    """Construct a Honcho client; cached per (api_key, workspace_id)."""
+    return _load_sdk()(api_key=api_key, workspace_id=workspace_id)
+
+
+def get_client(context=None) -> Optional[Any]:
+    """Get or create a cached Honcho client."""
+    api_key = get_api_key(context)
+    if not api_key:
+        return None
+    if _load_sdk() is None:
+        return None
+
+    workspace_id = get_workspace_id(context)
     try:
-        client = Honcho(api_key=api_key, workspace_id=workspace_id)
-        _client_cache[workspace_id] = client
-        _log(context, f"Connected to workspace: {workspace_id}", "util")
-        return client
+        return _build_client(api_key, workspace_id)
     except Exception as e:
         _log(context, f"Client error: {e}", "error")
         return None
@@ -112,7 +190,11 @@ def get_session_id(context) -> str:
     """Derive Honcho session ID from the A0 chat context."""
     if hasattr(context, 'id') and context.id:
         return f"chat-{context.id}"
-    return f"session-{id(context)}"
+    uid = _context_uids.get(context)
+    if uid is None:
+        # setdefault keeps the first ID if worker threads race here
+        uid = _context_uids.setdefault(context, f"session-{uuid.uuid4().hex}")
+    return uid
 
 
 def get_user_id(context=None) -> str:
@@ -132,34 +214,74 @@ def get_agent_peer_id(context=None) -> str:
     return "agent-zero"
 
 
+def _is_initialized(context) -> bool:
+    """Check if this context has a live Honcho session for the current credentials."""
+    state = getattr(context, '_honcho', None)
+    if not state or not state.get('enabled'):
+        return False
+    # Handles are bound to the client they were built with; a changed API key
+    # or workspace needs a fresh session
+    return state.get('credentials') == (get_api_key(context), get_workspace_id(context))
+
+
 def ensure_initialized(context) -> bool:
     """Ensure Honcho session is initialized for this context."""
-    if hasattr(context, '_honcho') and context._honcho.get('enabled'):
+    if _is_initialized(context):
         return True
 
     if not is_configured(context):
         return False
 
+    # Serialize concurrent first-time init for the same session
+    lock = _init_locks[hash(get_session_id(context)) % _INIT_LOCK_STRIPES]
+    with lock:
+        if _is_initialized(context):
+            return True
+        return _initialize(context)
+
+
+async def ensure_initialized_async(context) -> bool:
+    """Async variant of ensure_initialized that keeps network calls off the event loop."""
+    if _is_initialized(context):
+        return True
+    if not is_configured(context):
+        return False
+    return await asyncio.to_thread(ensure_initialized, context)
+
+
+def _initialize(context) -> bool:
+    """Create the session and peers for this context. Caller holds the init lock."""
+    credentials = (get_api_key(context), get_workspace_id(context))
     client = get_client(context)
     if not client:
         return False
 
     if not hasattr(context, '_honcho'):
         context._honcho = {}
+    if context._honcho.get('credentials') not in (None, credentials):
+        _log(context, "Honcho credentials changed, reinitializing session", "util")
 
     session_id = get_session_id(context)
+    user_id = get_user_id(context)
     try:
         session = client.session(session_id)
-        user_peer = client.peer(get_user_id(context))
+        user_peer = client.peer(user_id)
         agent_peer = client.peer(get_agent_peer_id(context))
         try:
             session.add_peers([user_peer, agent_peer])
         except Exception:
             pass  # Peers may already be added
 
-        context._honcho['enabled'] = True
+        # Session and peer handles stay valid until the credentials change
+        context._honcho['credentials'] = credentials
         context._honcho['session_id'] = session_id
-        _log(context, f"Session initialized: {session_id}", "util")
+        context._honcho['user_id'] = user_id
+        context._honcho['session'] = session
+        context._honcho['user_peer'] = user_peer
+        context._honcho['agent_peer'] = agent_peer
+        context._honcho['enabled'] = True
+        clear_context_cache(session_id)
+        _log(context, f"Session initialized: {session_id} (workspace: {credentials[1]})", "util")
         return True
     except Exception as e:
         _log(context, f"Init error: {e}", "error")
@@ -167,73 +289,212 @@ def ensure_initialized(context) -> bool:
         return False
 
 
-def sync_message(context, role: str, content: str) -> bool:
-    """Sync a message to Honcho Cloud."""
-    if not ensure_initialized(context):
-        return False
+def _push_messages(state: Dict[str, Any], items) -> None:
+    """Upload (role, content) pairs to the session in ``state`` in one call."""
+    messages = []
+    for role, content in items:
+        peer = state['user_peer'] if role == "user" else state['agent_peer']
+        if len(content) > MAX_MESSAGE_LENGTH:
+            content = content[:MAX_MESSAGE_LENGTH]
+        messages.append(peer.message(content))
+    state['session'].add_messages(messages)
+
+
+async def _sync_worker(context_ref, state: Dict[str, Any], queue: asyncio.Queue):
+    """Drain queued messages and upload them in batches off the event loop."""
+    # Holds the context weakly so a running worker never keeps it alive
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < SYNC_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+        try:
+            await asyncio.to_thread(_push_messages, state, batch)
+        except Exception as e:
+            _log(context_ref(), f"Sync error: {e}", "error")
+        finally:
+            for _ in batch:
+                queue.task_done()
 
-    client = get_client(context)
-    if not client:
-        return False
 
+def _cancel_sync_task(task: asyncio.Task):
+    """Cancel a sync worker from any thread; no-op once its loop has closed."""
     try:
-        session_id = get_session_id(context)
-        session = client.session(session_id)
+        task.get_loop().call_soon_threadsafe(task.cancel)
+    except RuntimeError:
+        pass  # Loop already closed
+
+
+def _cancel_state_worker(state: Dict[str, Any]):
+    """Cancel whichever sync worker ``state`` currently holds."""
+    task = state.get('sync_task')
+    if task is not None and not task.done():
+        _cancel_sync_task(task)
+
+
+def _start_sync_worker(context, state: Dict[str, Any]):
+    """Start a sync worker on the running loop, taking over any pending messages."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SYNC_QUEUE_SIZE)
+
+    old_task = state.get('sync_task')
+    if old_task is not None and not old_task.done():
+        _cancel_sync_task(old_task)
+
+    # Queues are bound to their event loop. Move messages still waiting on
+    # the previous loop's queue; both queues share one maxsize so all fit.
+    old_queue = state.get('sync_queue')
+    carried = 0
+    while old_queue is not None and not old_queue.empty():
+        queue.put_nowait(old_queue.get_nowait())
+        carried += 1
+    if carried:
+        _log(context, f"Sync worker restarted, carried over {carried} pending messages", "util")
+
+    state['sync_queue'] = queue
+    state['sync_task'] = asyncio.create_task(
+        _sync_worker(weakref.ref(context), state, queue)
+    )
+    # One finalizer per context; it cancels whichever worker is current
+    if 'sync_finalizer' not in state:
+        state['sync_finalizer'] = weakref.finalize(context, _cancel_state_worker, state)
+
+
+async def enqueue_message(context, role: str, content: str) -> bool:
+    """Queue a message for background sync to Honcho Cloud."""
+    if not await ensure_initialized_async(context):
+        return False
 
-        if role == "user":
-            peer = client.peer(get_user_id(context))
-        else:
-            peer = client.peer(get_agent_peer_id(context))
+    state = context._honcho
+    task = state.get('sync_task')
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        _start_sync_worker(context, state)
 
-        msg = peer.message(content[:10000])
-        session.add_messages([msg])
-        return True
-    except Exception as e:
-        _log(context, f"Sync error: {e}", "error")
+    try:
+        state['sync_queue'].put_nowait((role, content))
+    except asyncio.QueueFull:
+        # Never stall the agent loop on a slow or unreachable Honcho
+        _log(context, "Sync queue full, message dropped", "warning")
         return False
+    return True
 
 
-def get_user_context(context, max_tokens: int = 500) -> Optional[str]:
-    """Fetch user context from Honcho for system prompt injection."""
-    if not ensure_initialized(context):
-        return None
+async def flush_sync(context, timeout: float = SYNC_FLUSH_TIMEOUT):
+    """Wait, up to ``timeout`` seconds, for this context's queued messages to upload."""
+    state = getattr(context, '_honcho', None)
+    task = state.get('sync_task') if state else None
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        return
 
-    # Check cache
-    session_id = get_session_id(context)
-    cache_ttl = 120
+    # The worker keeps running either way; anything left over uploads later
+    queue = state['sync_queue']
+    try:
+        await asyncio.wait_for(queue.join(), timeout)
+    except asyncio.TimeoutError:
+        _log(
+            context,
+            f"Sync flush timed out, {queue.qsize()} messages still pending",
+            "warning",
+        )
+
+
+def _effective_cache_ttl(cache_ttl: float) -> float:
+    """Shorten the context TTL as the cache nears capacity."""
+    pressure = len(_context_cache) / _CACHE_MAX
+    if pressure <= _CACHE_PRESSURE_THRESHOLD:
+        return cache_ttl
+    excess = (pressure - _CACHE_PRESSURE_THRESHOLD) / (1 - _CACHE_PRESSURE_THRESHOLD)
+    return cache_ttl * max(1 - excess * (1 - _CACHE_TTL_FLOOR), _CACHE_TTL_FLOOR)
+
+
+def _get_cache_ttl(context) -> float:
+    """Read the configured context cache TTL in seconds."""
     if context and hasattr(context, 'agent0'):
         config = _get_plugin_config(context.agent0)
-        cache_ttl = config.get("honcho_cache_ttl", 120)
+        return config.get("honcho_cache_ttl", 120)
+    return 120
+
+
+def _store_context(session_id: str, result: Optional[str], cache_ttl: float):
+    """Cache a fetched user context, evicting expired then least-recent entries."""
+    now = time.monotonic()
+    with _context_cache_lock:
+        for sid, (cached_time, _) in list(_context_cache.items()):
+            if now - cached_time >= cache_ttl:
+                del _context_cache[sid]
+        _context_cache[session_id] = (now, result)
+        _context_cache.move_to_end(session_id)
+        while len(_context_cache) > _CACHE_MAX:
+            _context_cache.popitem(last=False)
+
+
+def _get_cached_context(context) -> tuple:
+    """Return (hit, user_context) from the cache for an initialized context."""
+    session_id = context._honcho['session_id']
+    cache_ttl = _get_cache_ttl(context)
+
+    with _context_cache_lock:
+        cached = _context_cache.get(session_id)
+        if cached is not None:
+            cached_time, cached_context = cached
+            if time.monotonic() - cached_time < _effective_cache_ttl(cache_ttl):
+                _context_cache.move_to_end(session_id)
+                return True, cached_context
+    return False, None
 
-    if session_id in _context_cache:
-        cached_time, cached_context = _context_cache[session_id]
-        if time.time() - cached_time < cache_ttl:
-            return cached_context
 
-    client = get_client(context)
-    if not client:
+def get_user_context(context, max_tokens: int = 500) -> Optional[str]:
+    """Fetch user context from Honcho for system prompt injection."""
+    if not ensure_initialized(context):
         return None
 
+    hit, cached_context = _get_cached_context(context)
+    if hit:
+        return cached_context
+
+    session_id = context._honcho['session_id']
     try:
-        session = client.session(session_id)
-        user_id = get_user_id(context)
+        session = context._honcho['session']
+        user_id = context._honcho['user_id']
         ctx = session.context(peer_target=user_id, tokens=max_tokens)
-        result = None
-        if hasattr(ctx, 'summary') and ctx.summary:
-            result = ctx.summary
-        elif hasattr(ctx, 'peer_representation') and ctx.peer_representation:
-            result = ctx.peer_representation
-        _context_cache[session_id] = (time.time(), result)
+        result = (
+            getattr(ctx, 'summary', None)
+            or getattr(ctx, 'peer_representation', None)
+            or None
+        )
+        _store_context(session_id, result, _get_cache_ttl(context))
         return result
     except Exception as e:
         _log(context, f"Context error: {e}", "error")
         return None
 
 
+async def get_user_context_async(context, max_tokens: int = 500) -> Optional[str]:
+    """Async variant of get_user_context; cache misses are fetched in a worker thread."""
+    if not await ensure_initialized_async(context):
+        return None
+
+    hit, cached_context = _get_cached_context(context)
+    if hit:
+        return cached_context
+    return await asyncio.to_thread(get_user_context, context, max_tokens)
+
+
 def clear_context_cache(session_id: Optional[str] = None):
     """Clear cached context."""
-    global _context_cache
-    if session_id:
-        _context_cache.pop(session_id, None)
+    with _context_cache_lock:
+        if session_id:
+            _context_cache.pop(session_id, None)
+        else:
+            _context_cache.clear()
+
+
+def clear_client_cache():
+    """Drop all cached Honcho clients."""
+    _build_client.cache_clear()
+
+
+def clear_secrets_cache(context=None):
+    """Clear cached secrets for one context, or all of them."""
+    if context is not None:
+        _secrets_cache.pop(_secrets_key(context), None)
     else:
-        _context_cache = {}
+        _secrets_cache.clear()